@@ -0,0 +1,29 @@
+# cython: language_level=3
+# Compiled fast path for debugassist.preprocess.normalize_text(_batch). Build with:
+#   python setup.py build_ext --inplace
+# preprocess.py falls back to the pure-Python version when this isn't built.
+
+from debugassist.preprocess import _NORMALIZE_RE, _REPL
+
+cdef object _sub = _NORMALIZE_RE.sub
+cdef dict _repl = _REPL
+
+
+def _replace(m):
+    return _repl[m.lastgroup]
+
+
+cpdef str normalize_text(str text):
+    if text is None:
+        return ""
+
+    return _sub(_replace, text.strip().lower()).strip()
+
+
+cpdef list normalize_text_batch(object texts):
+    cdef list out = []
+
+    for t in texts:
+        out.append(normalize_text(t if isinstance(t, str) else str(t)))
+
+    return out
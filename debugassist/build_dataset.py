@@ -2,11 +2,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 
+import csv
+import hashlib
+import os
 import random
 import re
-import pandas as pd
+from multiprocessing import Pool
+import numpy as np
 import typer
 
 
@@ -71,22 +75,71 @@ URLS = [
 
 STRINGS = ["abc", "12a", "None", "TRUE", "3.14.15", "01-32-2025"]
 
-def _rand_line() -> int:
-    return random.randint(1, 250)
+NAMES = ["get", "post", "Client", "Session", "DataFrame", "load", "dump"]
 
-def _choice(xs: List[str]) -> str:
-    return random.choice(xs)
+TYPES = ["int", "str", "list", "dict", "NoneType", "float", "bool"]
 
-def _maybe_truncate(trace: str) -> str:
+ATTRS = ["split", "items", "get", "append", "read", "to_json", "keys"]
+
+DICT_NAMES = ["payload", "data", "row", "obj", "record"]
+
+LIST_NAMES = ["items", "results", "values", "rows"]
+
+TIMEOUTS = [1, 2, 3, 5, 10]
+
+BAD_LINES = [
+    "if x == 3 print(x)",
+    "def func(x)\n        return x",
+    "for i in range(10)\n    print(i)",
+    "print('hello'",
+    "my_list = [1, 2, 3",
+    "return return x",
+]
+
+# Value pool for every template field, as arrays so _draw_fields can sample
+# each one for all rows in a single Generator call.
+FIELD_POOLS: Dict[str, np.ndarray] = {
+    "module": np.array(MODULES, dtype=object),
+    "file": np.array(FILES, dtype=object),
+    "line": np.arange(1, 251),
+    "func": np.array(FUNCS, dtype=object),
+    "var": np.array(VARS, dtype=object),
+    "other": np.array(VARS, dtype=object),
+    "name": np.array(NAMES, dtype=object),
+    "t1": np.array(TYPES, dtype=object),
+    "t2": np.array(TYPES, dtype=object),
+    "attr": np.array(ATTRS, dtype=object),
+    "dictname": np.array(DICT_NAMES, dtype=object),
+    "listname": np.array(LIST_NAMES, dtype=object),
+    "key": np.array(KEYS, dtype=object),
+    "idx": np.arange(0, 26),
+    "s": np.array(STRINGS, dtype=object),
+    "num": np.arange(0, 1000),
+    "path": np.array(PATHS, dtype=object),
+    "host": np.array(HOSTS, dtype=object),
+    "url": np.array(URLS, dtype=object),
+    "timeout": np.array(TIMEOUTS),
+    "bad_line": np.array(BAD_LINES, dtype=object),
+}
+
+def _draw_fields(rng: np.random.Generator, total: int) -> Callable[[int], Dict[str, object]]:
+    """
+    Draw every template field for all rows up front, one
+    Generator.choice batch per field instead of ~20 calls per row.
+    Returns a lookup that builds row k's field dict on demand.
+    """
+    names = list(FIELD_POOLS)
+    columns = [rng.choice(FIELD_POOLS[name], size=total).tolist() for name in names]
+
+    return lambda k: {name: column[k] for name, column in zip(names, columns)}
+
+def _maybe_truncate(lines: List[str], r: float) -> str:
     """
     Simulate real-world paste: sometimes users paste full traceback,
     sometimes only the last lines.
     """
-    r = random.random()
-    lines = trace.strip("\n").splitlines()
-    
     if len(lines) <= 3:
-        return trace.strip("\n")
+        return "\n".join(lines)
 
     if r < 0.20:
         return lines[-1]
@@ -98,28 +151,32 @@ def _maybe_truncate(trace: str) -> str:
         if lines[0].startswith("Traceback"):
             return "\n".join(lines[1:])
         
-    return trace.strip("\n")
+    return "\n".join(lines)
 
 def _sanitize_fix(fix: str) -> str:
     return re.sub(r"\s+", " ", fix).strip()
 
 @dataclass
 class TemplateSpec:
-    templates: List[str]
+    templates: List[Callable[..., List[str]]]
     fix_texts: List[str]
 
 def _specs() -> Dict[str, TemplateSpec]:
     return {
         "import_error": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}, in <module>
-                        import {module}
-                    ModuleNotFoundError: No module named '{module}'""",
-                                    """Traceback (most recent call last):
-                    File "{file}", line {line}, in <module>
-                        from {module} import {name}
-                    ImportError: cannot import name '{name}' from '{module}'""",
+                lambda file, line, module, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in <module>',
+                    f"                        import {module}",
+                    f"                    ModuleNotFoundError: No module named '{module}'",
+                ],
+                lambda file, line, module, name, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in <module>',
+                    f"                        from {module} import {name}",
+                    f"                    ImportError: cannot import name '{name}' from '{module}'",
+                ],
             ],
             fix_texts=[
                 "Install the missing dependency: python -m pip install <module>; verify the correct virtual environment is active; restart the interpreter/kernel.",
@@ -129,14 +186,18 @@ def _specs() -> Dict[str, TemplateSpec]:
 
         "syntax_error": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}
-                        {bad_line}
-                    SyntaxError: invalid syntax""",
-                                    """Traceback (most recent call last):
-                    File "{file}", line {line}
-                        {bad_line}
-                    IndentationError: unexpected indent""",
+                lambda file, line, bad_line, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}',
+                    *f"                        {bad_line}".split("\n"),
+                    "                    SyntaxError: invalid syntax",
+                ],
+                lambda file, line, bad_line, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}',
+                    *f"                        {bad_line}".split("\n"),
+                    "                    IndentationError: unexpected indent",
+                ],
             ],
             fix_texts=[
                 "Check the indicated line for missing punctuation (':', ')', ']', quotes) or incomplete statements; comment out recent edits to isolate.",
@@ -146,14 +207,18 @@ def _specs() -> Dict[str, TemplateSpec]:
 
         "type_error": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var} = {var} + {other}
-                    TypeError: unsupported operand type(s) for +: '{t1}' and '{t2}'""",
-                                    """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var}()
-                    TypeError: '{t1}' object is not callable""",
+                lambda file, line, func, var, other, t1, t2, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var} = {var} + {other}",
+                    f"                    TypeError: unsupported operand type(s) for +: '{t1}' and '{t2}'",
+                ],
+                lambda file, line, func, var, t1, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var}()",
+                    f"                    TypeError: '{t1}' object is not callable",
+                ],
             ],
             fix_texts=[
                 "Inspect types with type(x); convert/cast to compatible types before operation; validate inputs (e.g., int(), float(), str()).",
@@ -163,14 +228,18 @@ def _specs() -> Dict[str, TemplateSpec]:
 
         "value_error": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var} = int('{s}')
-                    ValueError: invalid literal for int() with base 10: '{s}'""",
-                                    """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var}.remove({num})
-                    ValueError: list.remove(x): x not in list""",
+                lambda file, line, func, var, s, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var} = int('{s}')",
+                    f"                    ValueError: invalid literal for int() with base 10: '{s}'",
+                ],
+                lambda file, line, func, var, num, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var}.remove({num})",
+                    "                    ValueError: list.remove(x): x not in list",
+                ],
             ],
             fix_texts=[
                 "Validate/clean the string before casting; use try/except around parsing; confirm the expected format.",
@@ -180,14 +249,18 @@ def _specs() -> Dict[str, TemplateSpec]:
 
         "attribute_error": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var}.{attr}()
-                    AttributeError: '{t1}' object has no attribute '{attr}'""",
-                                    """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var}.split(',')
-                    AttributeError: 'NoneType' object has no attribute 'split'""",
+                lambda file, line, func, var, attr, t1, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var}.{attr}()",
+                    f"                    AttributeError: '{t1}' object has no attribute '{attr}'",
+                ],
+                lambda file, line, func, var, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var}.split(',')",
+                    "                    AttributeError: 'NoneType' object has no attribute 'split'",
+                ],
             ],
             fix_texts=[
                 "Print the object and type(obj) before the failing line; confirm the attribute exists; check spelling and expected object type.",
@@ -197,12 +270,16 @@ def _specs() -> Dict[str, TemplateSpec]:
 
         "key_error": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var} = {dictname}['{key}']
-                    KeyError: '{key}'""",
-                                    """ERROR: Failed to process request
-                    '{key}'""",
+                lambda file, line, func, var, dictname, key, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var} = {dictname}['{key}']",
+                    f"                    KeyError: '{key}'",
+                ],
+                lambda key, **_: [
+                    "ERROR: Failed to process request",
+                    f"                    '{key}'",
+                ],
             ],
             fix_texts=[
                 "Print dictionary keys and confirm the key exists; use dict.get(key, default) when appropriate; normalize key formatting (case/whitespace).",
@@ -212,11 +289,15 @@ def _specs() -> Dict[str, TemplateSpec]:
 
         "index_error": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var} = {listname}[{idx}]
-                    IndexError: list index out of range""",
-                                    """list index out of range""",
+                lambda file, line, func, var, listname, idx, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var} = {listname}[{idx}]",
+                    "                    IndexError: list index out of range",
+                ],
+                lambda **_: [
+                    "list index out of range",
+                ],
             ],
             fix_texts=[
                 "Check list length with len(list); guard bounds; review loop conditions for off-by-one errors; handle empty lists.",
@@ -226,14 +307,18 @@ def _specs() -> Dict[str, TemplateSpec]:
 
         "file_error": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        f = open('{path}', 'r')
-                    FileNotFoundError: [Errno 2] No such file or directory: '{path}'""",
-                                    """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        f = open('{path}', 'w')
-                    PermissionError: [Errno 13] Permission denied: '{path}'""",
+                lambda file, line, func, path, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        f = open('{path}', 'r')",
+                    f"                    FileNotFoundError: [Errno 2] No such file or directory: '{path}'",
+                ],
+                lambda file, line, func, path, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        f = open('{path}', 'w')",
+                    f"                    PermissionError: [Errno 13] Permission denied: '{path}'",
+                ],
             ],
             fix_texts=[
                 "Print the absolute path and working directory; confirm the file exists; use pathlib to build paths; ensure correct relative path.",
@@ -243,14 +328,18 @@ def _specs() -> Dict[str, TemplateSpec]:
 
         "zero_division": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var} = {num} / 0
-                    ZeroDivisionError: division by zero""",
-                                    """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        {var} = {num} // 0
-                    ZeroDivisionError: integer division or modulo by zero""",
+                lambda file, line, func, var, num, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var} = {num} / 0",
+                    "                    ZeroDivisionError: division by zero",
+                ],
+                lambda file, line, func, var, num, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        {var} = {num} // 0",
+                    "                    ZeroDivisionError: integer division or modulo by zero",
+                ],
             ],
             fix_texts=[
                 "Guard denominators (if denom == 0); validate input ranges; handle empty/zero values before division.",
@@ -260,14 +349,18 @@ def _specs() -> Dict[str, TemplateSpec]:
 
         "connection_error": TemplateSpec(
             templates=[
-                """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        r = requests.get('{url}', timeout={timeout})
-                    requests.exceptions.Timeout: HTTPSConnectionPool(host='{host}', port=443): Read timed out.""",
-                                    """Traceback (most recent call last):
-                    File "{file}", line {line}, in {func}
-                        r = requests.get('{url}')
-                    requests.exceptions.ConnectionError: Failed to establish a new connection: [Errno 111] Connection refused""",
+                lambda file, line, func, url, timeout, host, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        r = requests.get('{url}', timeout={timeout})",
+                    f"                    requests.exceptions.Timeout: HTTPSConnectionPool(host='{host}', port=443): Read timed out.",
+                ],
+                lambda file, line, func, url, **_: [
+                    "Traceback (most recent call last):",
+                    f'                    File "{file}", line {line}, in {func}',
+                    f"                        r = requests.get('{url}')",
+                    "                    requests.exceptions.ConnectionError: Failed to establish a new connection: [Errno 111] Connection refused",
+                ],
             ],
             fix_texts=[
                 "Increase timeout; verify network connectivity/DNS; confirm the service is up; add retries/backoff; check proxy settings.",
@@ -276,60 +369,8 @@ def _specs() -> Dict[str, TemplateSpec]:
         ),
     }
 
-def _render(template: str) -> str:
-    module = _choice(MODULES)
-    file = _choice(FILES)
-    func = _choice(FUNCS)
-    var = _choice(VARS)
-    other = _choice(VARS)
-    name = random.choice(["get", "post", "Client", "Session", "DataFrame", "load", "dump"])
-    t1 = random.choice(["int", "str", "list", "dict", "NoneType", "float", "bool"])
-    t2 = random.choice(["int", "str", "list", "dict", "NoneType", "float", "bool"])
-    attr = random.choice(["split", "items", "get", "append", "read", "to_json", "keys"])
-    dictname = random.choice(["payload", "data", "row", "obj", "record"])
-    listname = random.choice(["items", "results", "values", "rows"])
-    key = _choice(KEYS)
-    idx = random.randint(0, 25)
-    s = _choice(STRINGS)
-    num = random.randint(0, 999)
-    path = _choice(PATHS)
-    host = _choice(HOSTS)
-    url = _choice(URLS)
-    timeout = random.choice([1, 2, 3, 5, 10])
-
-    bad_line = random.choice([
-        "if x == 3 print(x)",
-        "def func(x)\n        return x",
-        "for i in range(10)\n    print(i)",
-        "print('hello'",
-        "my_list = [1, 2, 3",
-        "return return x",
-    ])
-
-    rendered = template.format(
-        module=module,
-        file=file,
-        line=_rand_line(),
-        func=func,
-        var=var,
-        other=other,
-        name=name,
-        t1=t1,
-        t2=t2,
-        attr=attr,
-        dictname=dictname,
-        listname=listname,
-        key=key,
-        idx=idx,
-        s=s,
-        num=num,
-        path=path,
-        host=host,
-        url=url,
-        timeout=timeout,
-        bad_line=bad_line,
-    )
-    return _maybe_truncate(rendered)
+def _render(template: Callable[..., List[str]], fields: Dict[str, object], r: float) -> str:
+    return _maybe_truncate(template(**fields), r)
 
 def _plan_counts(total: int | None, per_class: int | None) -> Dict[str, int]:
     if (total is None and per_class is None) or (total is not None and per_class is not None):
@@ -358,44 +399,95 @@ def _plan_counts(total: int | None, per_class: int | None) -> Dict[str, int]:
         
     return counts
 
+# Below this many rows, starting worker processes (spawned, on macOS and
+# Windows) costs far more than rendering serially.
+PARALLEL_MIN_ROWS = 50_000
+
+def _family_seed(seed: int, family: str) -> int:
+    digest = hashlib.blake2b(f"{seed}:{family}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+def _family_rows(family: str, n: int, sub_seed: int) -> Callable[[int], Tuple[str, str]]:
+    """
+    Make every random draw for one family's n rows up front, from its own
+    Generator seeded from the family's sub-seed, and return a function that
+    renders row k's (error_text, fix_text) on demand. Rendering is the costly
+    part, so rows can be streamed out in any order without holding them all.
+    """
+    rng = np.random.default_rng(sub_seed)
+
+    spec = _specs()[family]
+    fix_texts = [_sanitize_fix(fix) for fix in spec.fix_texts]
+
+    template_idx = rng.integers(len(spec.templates), size=n).tolist()
+    fix_idx = rng.integers(len(fix_texts), size=n).tolist()
+    fields = _draw_fields(rng, n)
+    truncations = rng.random(n).tolist()
+
+    def row(k: int) -> Tuple[str, str]:
+        return _render(spec.templates[template_idx[k]], fields(k), truncations[k]), fix_texts[fix_idx[k]]
+
+    return row
+
+def _gen_family(task: Tuple[str, int, int]) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Render all rows for one family. Runs in a worker process, so it rebuilds
+    the (unpicklable) template specs itself via _family_rows.
+    """
+    family, n, sub_seed = task
+    row = _family_rows(family, n, sub_seed)
+
+    return family, [row(k) for k in range(n)]
+
 @app.command()
 def main(
     total: int = typer.Option(None, help="Total number of rows to generate across all classes (e.g., 300)."),
     per_class: int = typer.Option(None, help="Number of rows per error family (e.g., 50)."),
     out: Path = typer.Option(Path("data/debug_cases.csv"), help="Output CSV path."),
     seed: int = typer.Option(42, help="Random seed for reproducibility."),
+    workers: int = typer.Option(
+        None,
+        help=f"Worker processes for rendering (default: CPU count from {PARALLEL_MIN_ROWS} rows, else 1).",
+    ),
 ) -> None:
 
     random.seed(seed)
+    rng = np.random.default_rng(seed)
 
-    specs = _specs()
     counts = _plan_counts(total=total, per_class=per_class)
 
-    rows: List[Dict[str, str]] = []
-    next_id = 1
+    # Families are independent, so each one draws from a sub-seed derived
+    # from (seed, family); output is the same whether rows are rendered
+    # serially or by any number of workers, in any order.
+    tasks = [(family, n, _family_seed(seed, family)) for family, n in counts.items()]
 
-    for family, n in counts.items():
-        spec = specs[family]
-        
-        for _ in range(n):
-            template = random.choice(spec.templates)
-            fix = _sanitize_fix(random.choice(spec.fix_texts))
-            err_text = _render(template)
-
-            rows.append({
-                "id": str(next_id),
-                "error_text": err_text,
-                "error_family": family,
-                "fix_text": fix,
-            })
-            
-            next_id += 1
-
-    df = pd.DataFrame(rows)
-    df = df.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+    if workers is None:
+        workers = (os.cpu_count() or 1) if sum(counts.values()) >= PARALLEL_MIN_ROWS else 1
+
+    processes = min(workers, len(tasks))
+
+    # Serially, each row is rendered just before it is written. With workers,
+    # every family is rendered up front and rows are looked up from the lists.
+    if processes > 1:
+        with Pool(processes=processes) as pool:
+            rows = {family: rendered.__getitem__ for family, rendered in pool.imap_unordered(_gen_family, tasks)}
+    else:
+        rows = {family: _family_rows(family, n, sub_seed) for family, n, sub_seed in tasks}
+
+    plan = [(family, k) for family, n in counts.items() for k in range(n)]
+    order = rng.permutation(len(plan)).tolist()
 
     out.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out, index=False)
+
+    with out.open("w", newline="", encoding="utf-8", buffering=1024 * 1024) as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["id", "error_text", "error_family", "fix_text"])
+
+        for next_id, i in enumerate(order, start=1):
+            family, k = plan[i]
+            err_text, fix = rows[family](k)
+
+            writer.writerow([next_id, err_text, family, fix])
 
 if __name__ == "__main__":
     app()
@@ -4,17 +4,18 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import joblib
+import numpy as np
 import typer
 import yaml
 
 from debugassist.preprocess import combine_inputs, normalize_text
 from debugassist.rules import rule_predict
 from debugassist.retrieval import RetrievalIndex, SimilarCase
+from debugassist.vectorizer import TFIDF_PATH, load_vectorizer
 
 app = typer.Typer(add_completion=False)
 
 PLAYBOOK_PATH = Path("debugassist/playbooks.yaml")
-TFIDF_PATH = Path("models/tfidf.joblib")
 CLF_PATH = Path("models/clf.joblib")
 
 LOW_CONF_THRESHOLD = 0.35
@@ -32,6 +33,28 @@ def _load_playbooks(path: Path) -> Dict[str, Any]:
         
     if not isinstance(data, dict):
         raise ValueError("playbooks.yaml must parse to a dictionary at the top level.")
+
+    # Normalize each section once here so suggestion lookups don't re-stringify
+    # the checklist or re-lowercase every keyword phrase on each call.
+    for section in data.values():
+        if not isinstance(section, dict):
+            continue
+
+        checklist = section.get("checklist", [])
+        section["_checklist_strs"] = (
+            [str(x) for x in checklist] if isinstance(checklist, list) else []
+        )
+
+        keyword_tips = section.get("keyword_tips", {})
+        section["_keyword_tips_lower"] = (
+            [
+                (str(key_phrase).lower(), [str(t) for t in tips])
+                for key_phrase, tips in keyword_tips.items()
+                if isinstance(tips, list)
+            ]
+            if isinstance(keyword_tips, dict)
+            else []
+        )
     
     return data
 
@@ -44,7 +67,7 @@ def _load_model() -> Tuple[Any, Any]:
             "  2) python3 -m debugassist.train\n"
         )
         
-    vectorizer = joblib.load(TFIDF_PATH)
+    vectorizer = load_vectorizer()
     clf = joblib.load(CLF_PATH)
     
     return vectorizer, clf
@@ -64,14 +87,14 @@ def _predict_family_ml(
 
     if hasattr(clf, "predict_proba"):
         proba = clf.predict_proba(x_vec)[0]
-        classes = list(clf.classes_)
+        classes = clf.classes_
+        k = min(TOP_N_ALTERNATIVES, proba.shape[0])
+
+        if k > 0:
+            idx = np.argpartition(-proba, k - 1)[:k]
+            idx = idx[np.argsort(-proba[idx])]
+            top_candidates = [(str(classes[i]), float(proba[i])) for i in idx]
 
-        pairs = sorted(
-            [(str(classes[i]), float(proba[i])) for i in range(len(classes))],
-            key=lambda t: t[1],
-            reverse=True,
-        )
-        top_candidates = pairs[:TOP_N_ALTERNATIVES]
         conf = top_candidates[0][1] if top_candidates else None
 
         if top_candidates:
@@ -85,34 +108,15 @@ def _playbook_suggestions(playbooks: Dict[str, Any], family: str, raw_text: str)
         return []
 
     section = playbooks.get(family, {})
-    suggestions: List[str] = []
+    suggestions: List[str] = list(section.get("_checklist_strs", []))
 
-    checklist = section.get("checklist", [])
-    
-    if isinstance(checklist, list):
-        suggestions.extend([str(x) for x in checklist])
-
-    keyword_tips = section.get("keyword_tips", {})
-    
-    if isinstance(keyword_tips, dict):
-        lowered = raw_text.lower()
-        
-        for key_phrase, tips in keyword_tips.items():
-            key_phrase_str = str(key_phrase)
+    lowered = raw_text.lower()
 
-            if key_phrase_str.lower() in lowered:
-                if isinstance(tips, list):
-                    suggestions.extend([str(t) for t in tips])
+    for key_phrase, tips in section.get("_keyword_tips_lower", []):
+        if key_phrase in lowered:
+            suggestions.extend(tips)
 
-    seen = set()
-    out: List[str] = []
-    
-    for s in suggestions:
-        if s not in seen:
-            out.append(s)
-            seen.add(s)
-            
-    return out
+    return list(dict.fromkeys(suggestions))
 
 
 def _print_header(family: str, method: str, confidence: Optional[float]) -> None:
@@ -224,9 +228,12 @@ def main(
     suggestions = _playbook_suggestions(playbooks, family, raw_input)
     _print_single_checklist("Fix checklist:", suggestions)
 
-    retrieval = RetrievalIndex.load_default()
-    similar = retrieval.query(raw_input, top_k=top_k)
-    _print_similar_cases(similar)
+    # Loading the index reads the dataset and corpus matrix, so only do it
+    # when similar cases were actually asked for.
+    if top_k > 0:
+        retrieval = RetrievalIndex.load_default()
+        similar = retrieval.query(raw_input, top_k=top_k)
+        _print_similar_cases(similar)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,39 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Iterable, List, Optional
 
 import re
 
-_WHITESPACE_RE = re.compile(r"\s+")
-_WINDOWS_PATH_RE = re.compile(r"[A-Za-z]:\\(?:[^\\\n]+\\)*[^\\\n]+")
-_UNIX_PATH_RE = re.compile(r"(?:/[^/\n]+)+")
-_LINE_NUMBER_RE = re.compile(r"\bline\s+\d+\b", flags=re.IGNORECASE)
-_PLAIN_INT_RE = re.compile(r"\b\d+\b")
-_HEX_RE = re.compile(r"\b0x[0-9a-fA-F]+\b")
-_QUOTED_STR_RE = re.compile(r"(['\"])(?:(?=(\\?))\2.)*?\1")
+# Bump whenever normalize_text's output changes, so caches of normalized or
+# vectorized text built by an older version are not reused.
+NORM_VERSION = "2"
+
+# Every normalization step fused into one alternation so the text is scanned
+# once. Order matters: at a given position the first alternative wins, so paths
+# come before line numbers and line numbers and hex before plain ints. Anything
+# else that isn't a word character becomes a space, so the output is already
+# whitespace-separated tokens and the vectorizer can split on str.split. Single
+# spaces between words are never matched, so most of the text is left alone.
+_NORMALIZE_RE = re.compile(
+    r"(?P<winpath>[a-z]:\\(?:[^\\\n]+\\)*[^\\\n]+)"
+    r"|(?P<unixpath>(?:/[^/\n]+)+)"
+    r"|\b(?:(?P<lineno>line\s+\d+)|(?P<hex>0x[0-9a-f]+)|(?P<intnum>\d+))\b"
+    r"|(?P<qstr>'(?:\\.|[^'\\\n])*'|\"(?:\\.|[^\"\\\n])*\")"
+    r"|(?P<sep> ?[^\w'\"/\\ ][^\w'\"/\\]*|\s\s+|['\"/\\])"
+)
+
+_REPL = {
+    "winpath": "<PATH>",
+    "unixpath": "<PATH>",
+    "lineno": "line <LINE>",
+    "hex": "<HEX>",
+    "qstr": "<STR>",
+    "intnum": "<NUM>",
+    "sep": " ",
+}
+
+
+def _replace(m: re.Match) -> str:
+    return _REPL[m.lastgroup]
 
 
 def normalize_text(text: str) -> str:
@@ -18,20 +42,12 @@ def normalize_text(text: str) -> str:
 
     t = text.strip().lower()
 
-    t = _WINDOWS_PATH_RE.sub("<PATH>", t)
-    t = _UNIX_PATH_RE.sub("<PATH>", t)
-
-    t = _LINE_NUMBER_RE.sub("line <LINE>", t)
+    return _NORMALIZE_RE.sub(_replace, t).strip()
 
-    t = _HEX_RE.sub("<HEX>", t)
 
-    t = _QUOTED_STR_RE.sub("<STR>", t)
-
-    t = _PLAIN_INT_RE.sub("<NUM>", t)
-
-    t = _WHITESPACE_RE.sub(" ", t).strip()
-    
-    return t
+def normalize_text_batch(texts: Iterable[object]) -> List[str]:
+    """Normalize a whole column in one call; non-string cells are str()'d first."""
+    return [normalize_text(t if isinstance(t, str) else str(t)) for t in texts]
 
 
 def combine_inputs(error_text: str, code: Optional[str] = None) -> str:
@@ -41,3 +57,9 @@ def combine_inputs(error_text: str, code: Optional[str] = None) -> str:
         return f"{err}\n<CODE>\n{code}"
     
     return err
+
+
+try:
+    from debugassist._preprocess_fast import normalize_text, normalize_text_batch  # noqa: F811
+except ImportError:
+    pass
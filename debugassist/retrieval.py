@@ -1,18 +1,66 @@
 from __future__ import annotations
 
+import os
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List
 
-import joblib
+import numpy as np
 import pandas as pd
+from scipy import sparse
 
-from sklearn.metrics.pairwise import cosine_similarity
-from debugassist.preprocess import normalize_text
+from sklearn.preprocessing import normalize
+from debugassist.preprocess import NORM_VERSION, normalize_text, normalize_text_batch
+from debugassist.vectorizer import TFIDF_PATH, load_vectorizer
 
 
 DATA_PATH = Path("data/debug_cases.csv")
-TFIDF_PATH = Path("models/tfidf.joblib")
+MATRIX_PATH = Path("models/retrieval_matrix.npz")
+MATRIX_FP_PATH = Path("models/retrieval_matrix.fp")
+
+
+def _fingerprint(*paths: Path) -> str:
+    parts = []
+
+    for path in paths:
+        st = path.stat()
+        parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+
+    return "|".join(parts)
+
+
+def _load_cached_matrix(fp: str, n_rows: int):
+    if not MATRIX_PATH.exists() or not MATRIX_FP_PATH.exists():
+        return None
+
+    if MATRIX_FP_PATH.read_text(encoding="utf-8") != fp:
+        return None
+
+    matrix = sparse.load_npz(MATRIX_PATH)
+
+    return matrix if matrix.shape[0] == n_rows else None
+
+
+def _save_cached_matrix(fp: str, matrix) -> None:
+    # Both files are written under temporary names and swapped in, so a
+    # concurrent reader never loads a half-written matrix; the fingerprint goes
+    # last, so a new matrix is never paired with a stale fingerprint that
+    # matches. If models/ isn't writable the index just isn't cached.
+    tmp_matrix = MATRIX_PATH.with_name(f"{MATRIX_PATH.stem}.{os.getpid()}.tmp.npz")
+    tmp_fp = MATRIX_FP_PATH.with_name(f"{MATRIX_FP_PATH.name}.{os.getpid()}.tmp")
+
+    try:
+        sparse.save_npz(tmp_matrix, matrix)
+        os.replace(tmp_matrix, MATRIX_PATH)
+        tmp_fp.write_text(fp, encoding="utf-8")
+        os.replace(tmp_fp, MATRIX_FP_PATH)
+    except OSError:
+        for tmp in (tmp_matrix, tmp_fp):
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
 
 
 @dataclass
@@ -25,15 +73,59 @@ class SimilarCase:
 
 
 class RetrievalIndex:
-    def __init__(self, df: pd.DataFrame, vectorizer):
+    def __init__(self, df: pd.DataFrame, vectorizer, matrix=None):
         self.df = df.reset_index(drop=True)
         self.vectorizer = vectorizer
 
-        texts = self.df["error_text"].astype(str).apply(normalize_text).tolist()
-        self.matrix = self.vectorizer.transform(texts)
+        # TF-IDF rows from an L2-normalizing vectorizer are already unit length,
+        # so cosine similarity reduces to a plain sparse dot product. For a
+        # pipeline, the last step decides the output norm.
+        final_step = self.vectorizer.steps[-1][1] if hasattr(self.vectorizer, "steps") else self.vectorizer
+        self._unit_rows = getattr(final_step, "norm", None) == "l2"
+        self.matrix = matrix if matrix is not None else self._build_matrix()
+        self._score = self._pick_scorer()
+
+    def _build_matrix(self):
+        texts = normalize_text_batch(self.df["error_text"].to_numpy(dtype=object, copy=False))
+
+        matrix = self.vectorizer.transform(texts)
+
+        if not self._unit_rows:
+            matrix = normalize(matrix, norm="l2", copy=False)
+
+        return matrix
+
+    def _pick_scorer(self):
+        # A single query can be scored against the document-major CSR matrix
+        # (matrix @ q.T) or against a term-major copy (q @ matrix.T), which only
+        # touches the rows for terms present in the query. Which one is faster
+        # depends on the corpus, so time both once on a real row and keep it.
+        doc_major = self.matrix.tocsr()
+        term_major = doc_major.T.tocsr()
+
+        candidates = [
+            lambda q: doc_major.dot(q.T).toarray().ravel(),
+            lambda q: q.dot(term_major).toarray().ravel(),
+        ]
+
+        if doc_major.shape[0] == 0:
+            return candidates[0]
+
+        probe = doc_major[:1]
+        timings = []
+
+        for score in candidates:
+            start = time.perf_counter()
+
+            for _ in range(3):
+                score(probe)
+
+            timings.append(time.perf_counter() - start)
+
+        return candidates[timings.index(min(timings))]
 
     @classmethod
-    def load_default(cls) -> "RetrievalIndex":
+    def load_default(cls, vectorizer=None) -> "RetrievalIndex":
         if not DATA_PATH.exists():
             raise FileNotFoundError(
                 f"Dataset not found at {DATA_PATH}. Run build_dataset.py first."
@@ -52,9 +144,23 @@ class RetrievalIndex:
                 f"CSV must contain columns: {sorted(required)}"
             )
 
-        vectorizer = joblib.load(TFIDF_PATH)
-        
-        return cls(df=df, vectorizer=vectorizer)
+        # A caller-supplied vectorizer isn't the one the cache is keyed on, so
+        # its matrix is always built fresh and never written to the cache.
+        if vectorizer is not None:
+            return cls(df=df, vectorizer=vectorizer)
+
+        # The corpus matrix only changes when the dataset, the vectorizer or the
+        # normalization does, so it is cached next to the models and keyed on
+        # all three.
+        fp = f"{NORM_VERSION}|{_fingerprint(DATA_PATH, TFIDF_PATH)}"
+        matrix = _load_cached_matrix(fp, n_rows=len(df))
+
+        index = cls(df=df, vectorizer=load_vectorizer(), matrix=matrix)
+
+        if matrix is None:
+            _save_cached_matrix(fp, index.matrix)
+
+        return index
 
     def query(self, text: str, top_k: int = 3) -> List[SimilarCase]:
         if top_k <= 0:
@@ -63,21 +169,31 @@ class RetrievalIndex:
         q = normalize_text(text)
         q_vec = self.vectorizer.transform([q])
 
-        sims = cosine_similarity(q_vec, self.matrix).flatten()
+        if not self._unit_rows:
+            q_vec = normalize(q_vec, norm="l2", copy=False)
+
+        sims = self._score(q_vec)
+
+        k = min(top_k, sims.shape[0])
+
+        if k == 0:
+            return []
+
+        part = np.argpartition(sims, -k)[-k:]
+        top_idx = part[np.argsort(-sims[part])]
 
-        top_idx = sims.argsort()[::-1][:top_k]
+        rows = self.df.iloc[top_idx.tolist()].to_dict("records")
 
         results: List[SimilarCase] = []
         
-        for i in top_idx:
-            row = self.df.iloc[int(i)]
+        for i, row in zip(top_idx, rows):
             results.append(
                 SimilarCase(
                     id=str(row["id"]),
                     error_family=str(row["error_family"]),
                     error_text=str(row["error_text"]),
                     fix_text=str(row["fix_text"]),
-                    score=float(sims[int(i)]),
+                    score=float(sims[i]),
                 )
             )
 
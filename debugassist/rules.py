@@ -1,63 +1,176 @@
 from __future__ import annotations
 
 import re
+from itertools import groupby
 from typing import Optional
 
-_RULES: list[tuple[str, re.Pattern]] = [
-    ("import_error", re.compile(r"\bmoduleNotFoundError\b", re.IGNORECASE)),
-    ("import_error", re.compile(r"\bimporterror\b", re.IGNORECASE)),
-    ("import_error", re.compile(r"\bno module named\b", re.IGNORECASE)),
-    ("import_error", re.compile(r"\bcannot import name\b", re.IGNORECASE)),
-
-    ("syntax_error", re.compile(r"\bsyntaxerror\b", re.IGNORECASE)),
-    ("syntax_error", re.compile(r"\bindentationerror\b", re.IGNORECASE)),
-    ("syntax_error", re.compile(r"\bunexpected indent\b", re.IGNORECASE)),
-    ("syntax_error", re.compile(r"\bexpected an indented block\b", re.IGNORECASE)),
-
-    ("type_error", re.compile(r"\btypeerror\b", re.IGNORECASE)),
-    ("type_error", re.compile(r"\bnot callable\b", re.IGNORECASE)),
-    ("type_error", re.compile(r"\bunsupported operand type", re.IGNORECASE)),
-    ("type_error", re.compile(r"\bhas no len\(\)\b", re.IGNORECASE)),
-
-    ("value_error", re.compile(r"\bvalueerror\b", re.IGNORECASE)),
-    ("value_error", re.compile(r"\binvalid literal for int\(\)", re.IGNORECASE)),
-    ("value_error", re.compile(r"\bcould not convert string to float\b", re.IGNORECASE)),
-    ("value_error", re.compile(r"\blist\.remove\(x\): x not in list\b", re.IGNORECASE)),
-
-    ("attribute_error", re.compile(r"\battributeerror\b", re.IGNORECASE)),
-    ("attribute_error", re.compile(r"\bhas no attribute\b", re.IGNORECASE)),
-    ("attribute_error", re.compile(r"\bnonetype\b.*\bhas no attribute\b", re.IGNORECASE)),
-
-    ("key_error", re.compile(r"\bkeyerror\b", re.IGNORECASE)),
-    ("key_error", re.compile(r"^\s*['\"][A-Za-z0-9_ -]{1,40}['\"]\s*$", re.MULTILINE)),
-
-    ("index_error", re.compile(r"\bindexerror\b", re.IGNORECASE)),
-    ("index_error", re.compile(r"\blist index out of range\b", re.IGNORECASE)),
-
-    ("file_error", re.compile(r"\bfilenotfounderror\b", re.IGNORECASE)),
-    ("file_error", re.compile(r"\bpermissionerror\b", re.IGNORECASE)),
-    ("file_error", re.compile(r"\bno such file or directory\b", re.IGNORECASE)),
-    ("file_error", re.compile(r"\bpermission denied\b", re.IGNORECASE)),
-
-    ("zero_division", re.compile(r"\bzerodivisionerror\b", re.IGNORECASE)),
-    ("zero_division", re.compile(r"\bdivision by zero\b", re.IGNORECASE)),
-    ("zero_division", re.compile(r"\binteger division or modulo by zero\b", re.IGNORECASE)),
-
-    ("connection_error", re.compile(r"\brequests\.exceptions\.timeout\b", re.IGNORECASE)),
-    ("connection_error", re.compile(r"\brequests\.exceptions\.connectionerror\b", re.IGNORECASE)),
-    ("connection_error", re.compile(r"\bread timed out\b", re.IGNORECASE)),
-    ("connection_error", re.compile(r"\bconnection refused\b", re.IGNORECASE)),
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+_RULES: list[tuple[str, str, int]] = [
+    ("import_error", r"\bmoduleNotFoundError\b", re.IGNORECASE),
+    ("import_error", r"\bimporterror\b", re.IGNORECASE),
+    ("import_error", r"\bno module named\b", re.IGNORECASE),
+    ("import_error", r"\bcannot import name\b", re.IGNORECASE),
+
+    ("syntax_error", r"\bsyntaxerror\b", re.IGNORECASE),
+    ("syntax_error", r"\bindentationerror\b", re.IGNORECASE),
+    ("syntax_error", r"\bunexpected indent\b", re.IGNORECASE),
+    ("syntax_error", r"\bexpected an indented block\b", re.IGNORECASE),
+
+    ("type_error", r"\btypeerror\b", re.IGNORECASE),
+    ("type_error", r"\bnot callable\b", re.IGNORECASE),
+    ("type_error", r"\bunsupported operand type", re.IGNORECASE),
+    ("type_error", r"\bhas no len\(\)\b", re.IGNORECASE),
+
+    ("value_error", r"\bvalueerror\b", re.IGNORECASE),
+    ("value_error", r"\binvalid literal for int\(\)", re.IGNORECASE),
+    ("value_error", r"\bcould not convert string to float\b", re.IGNORECASE),
+    ("value_error", r"\blist\.remove\(x\): x not in list\b", re.IGNORECASE),
+
+    ("attribute_error", r"\battributeerror\b", re.IGNORECASE),
+    ("attribute_error", r"\bhas no attribute\b", re.IGNORECASE),
+    ("attribute_error", r"\bnonetype\b.*\bhas no attribute\b", re.IGNORECASE),
+
+    ("key_error", r"\bkeyerror\b", re.IGNORECASE),
+    ("key_error", r"^\s*['\"][A-Za-z0-9_ -]{1,40}['\"]\s*$", re.MULTILINE),
+
+    ("index_error", r"\bindexerror\b", re.IGNORECASE),
+    ("index_error", r"\blist index out of range\b", re.IGNORECASE),
+
+    ("file_error", r"\bfilenotfounderror\b", re.IGNORECASE),
+    ("file_error", r"\bpermissionerror\b", re.IGNORECASE),
+    ("file_error", r"\bno such file or directory\b", re.IGNORECASE),
+    ("file_error", r"\bpermission denied\b", re.IGNORECASE),
+
+    ("zero_division", r"\bzerodivisionerror\b", re.IGNORECASE),
+    ("zero_division", r"\bdivision by zero\b", re.IGNORECASE),
+    ("zero_division", r"\binteger division or modulo by zero\b", re.IGNORECASE),
+
+    ("connection_error", r"\brequests\.exceptions\.timeout\b", re.IGNORECASE),
+    ("connection_error", r"\brequests\.exceptions\.connectionerror\b", re.IGNORECASE),
+    ("connection_error", r"\bread timed out\b", re.IGNORECASE),
+    ("connection_error", r"\bconnection refused\b", re.IGNORECASE),
 ]
 
 
+def _scoped(src: str, flags: int) -> str:
+    # Pin a rule's own IGNORECASE/MULTILINE on or off inside the fused pattern,
+    # so one rule's flags never leak into another's (e.g. IGNORECASE would let
+    # [A-Za-z] match 'ı', 'İ', 'ſ' and the Kelvin sign under Unicode folding).
+    on = "".join(c for c, f in (("i", re.IGNORECASE), ("m", re.MULTILINE)) if flags & f)
+    off = "".join(c for c in "im" if c not in on)
+
+    return f"(?{on}-{off}:{src})"
+
+
+def _fuse(rules: list[tuple[str, str, int]]) -> re.Pattern:
+    # Rule i becomes capture group i + 1. Consecutive rules that start with \b
+    # share one hoisted \b so the engine checks the boundary once per position.
+    parts: list[str] = []
+
+    for bounded, run in groupby(rules, key=lambda r: r[1].startswith(r"\b")):
+        alts = "|".join(f"({_scoped(src[2:] if bounded else src, flags)})" for _, src, flags in run)
+        parts.append(rf"\b(?:{alts})" if bounded else alts)
+
+    # Zero-width so finditer reports every start position; at each position the
+    # earliest rule wins, and the lowest group seen overall is the first rule in
+    # _RULES that matches anywhere, same as searching the rules one by one.
+    return re.compile("(?=" + "|".join(parts) + ")")
+
+
+_COMBINED = _fuse(_RULES)
+
+
+def _compile_hyperscan():
+    if hyperscan is None:
+        return None
+
+    db = hyperscan.Database()
+
+    try:
+        db.compile(
+            expressions=[src.encode("utf-8") for _, src, _ in _RULES],
+            ids=list(range(len(_RULES))),
+            flags=[
+                (hyperscan.HS_FLAG_CASELESS if flags & re.IGNORECASE else 0)
+                | (hyperscan.HS_FLAG_MULTILINE if flags & re.MULTILINE else 0)
+                | hyperscan.HS_FLAG_SINGLEMATCH
+                for _, _, flags in _RULES
+            ],
+        )
+    except hyperscan.error:
+        return None
+
+    return db
+
+
+# Optional Hyperscan backend. It reports hits by end offset rather than rule
+# order, so all hits are collected and the lowest rule id wins, as with _COMBINED.
+# Hyperscan scans bytes, so \b and \s are ASCII-only there; it is only used
+# for ASCII text, where that matches re exactly.
+_HS_DB = _compile_hyperscan()
+
+
 def rule_predict(error_text: str) -> Optional[str]:
     if not error_text or not error_text.strip():
         return None
 
     text = error_text.strip()
-    
-    for family, pattern in _RULES:
-        if pattern.search(text):
-            return family
-        
-    return None
+
+    if _HS_DB is not None and text.isascii():
+        hits: list[int] = []
+        _HS_DB.scan(
+            text.encode("ascii"),
+            match_event_handler=lambda rule_id, start, end, flags, context: hits.append(rule_id),
+        )
+
+        return _RULES[min(hits)][0] if hits else None
+
+    best = min((m.lastindex for m in _COMBINED.finditer(text)), default=None)
+
+    return _RULES[best - 1][0] if best else None
+
+
+def _check_fused(texts) -> list[str]:
+    """
+    Texts where rule_predict disagrees with searching each rule on its own,
+    compiled with its own flags, in _RULES order. Empty means the fused pattern
+    (and the Hyperscan database, when installed) preserves the rules exactly.
+    """
+    single = [(family, re.compile(src, flags)) for family, src, flags in _RULES]
+    mismatches = []
+
+    for text in texts:
+        stripped = text.strip()
+        expected = next((family for family, rx in single if rx.search(stripped)), None) if stripped else None
+
+        if rule_predict(text) != expected:
+            mismatches.append(text)
+
+    return mismatches
+
+
+if __name__ == "__main__":
+    import random
+    import sys
+
+    # Rule phrases and quoted keys mixed with case-folding and word-boundary
+    # edge characters, checked against the one-rule-at-a-time search.
+    rng = random.Random(0)
+    pieces = [re.sub(r"\\b|\\", "", src) for _, src, _ in _RULES] + [
+        "KeyError", "keyerror: 'id'", "'name'", '"user id"', "list index out of range",
+        "NoneType object has no attribute", "\n", "\n", " ", "'", '"', "_", "-",
+        "\u0130", "\u0131", "\u017f", "\u212a", "\u00e9", "\u00df", "0x1f", "42",
+    ]
+    cases = ["".join(rng.choice(pieces) for _ in range(rng.randint(1, 6))) for _ in range(20_000)]
+
+    bad = _check_fused(cases)
+    print(f"{len(cases) - len(bad)}/{len(cases)} agree")
+
+    for text in bad[:10]:
+        print(repr(text))
+
+    sys.exit(1 if bad else 0)
@@ -2,21 +2,236 @@ from __future__ import annotations
 
 from pathlib import Path
 
+import hashlib
 import os
+import zipfile
 import joblib
-import pandas as pd
+import numpy as np
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from joblib import Parallel, delayed
+from scipy import sparse
 
-from sklearn.feature_extraction.text import TfidfVectorizer
+# Optional Intel oneDAL acceleration; must patch before sklearn is imported.
+# LogisticRegression is left out: sklearnex falls back to stock sklearn for
+# sparse input anyway, and a patched class would be pickled into clf.joblib,
+# which predict.py could then only load with sklearnex installed. Patched
+# estimators are not safe to share across threads (this script uses none).
+try:
+    from sklearnex import get_patch_names, patch_sklearn
+    patch_sklearn([name for name in get_patch_names() if "log" not in name.lower()])
+except ImportError:
+    pass
+
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report, f1_score
-from sklearn.model_selection import train_test_split
+from sklearn.metrics import classification_report
+from sklearn.model_selection import StratifiedShuffleSplit
+from sklearn.utils.class_weight import compute_sample_weight
 
-from debugassist.preprocess import normalize_text
+from debugassist.preprocess import NORM_VERSION, normalize_text_batch
+from debugassist.vectorizer import TFIDF_PATH, build_vectorizer, save_vectorizer
 
 DATA_PATH = Path("data/debug_cases.csv")
 MODELS_DIR = Path("models")
-TFIDF_PATH = MODELS_DIR / "tfidf.joblib"
 CLF_PATH = MODELS_DIR / "clf.joblib"
+CACHE_DIR = MODELS_DIR / "cache"
+
+# Size of the hashed feature space. The normalized corpus has well under a
+# thousand distinct uni/bigrams, so 2**18 buckets keeps collisions negligible
+# while the classifier's dense coef_ (n_classes x N_FEATURES) stays small.
+N_FEATURES = 2**18
+
+# The classifier's coef_ is dense but almost entirely zero over the hashed
+# space, so even a fast codec shrinks the artifact by two orders of magnitude.
+try:
+    import lz4  # noqa: F401
+    COMPRESS = ("lz4", 3)
+except ImportError:
+    COMPRESS = ("zlib", 3)
+
+# Hashed buckets seen in fewer training documents than this get zero IDF, the
+# hashing equivalent of TfidfVectorizer(min_df=...): rare bigrams and one-off
+# identifiers stop contributing to any row.
+MIN_DF = 3
+
+# Rows per evaluation batch; bounds the TF-IDF copy of the test split.
+PREDICT_BATCH_SIZE = 4096
+
+# Below this many documents, spawning hashing workers costs more than it saves.
+PARALLEL_MIN_ROWS = 50_000
+
+
+def _normalize_and_hash(hasher: HashingVectorizer, texts) -> sparse.csr_matrix:
+    return hasher.transform(normalize_text_batch(texts))
+
+
+def _hash_texts(hasher: HashingVectorizer, texts) -> sparse.csr_matrix:
+    """
+    Normalize, tokenize and hash raw documents, sharded across processes for
+    large inputs. Normalization is per-document and HashingVectorizer is
+    stateless, so shards are processed independently and stacked back in order.
+    """
+    n_jobs = os.cpu_count() or 1
+
+    if len(texts) < PARALLEL_MIN_ROWS or n_jobs == 1:
+        return _normalize_and_hash(hasher, texts)
+
+    shards = np.array_split(np.asarray(texts, dtype=object), n_jobs)
+    parts = Parallel(n_jobs=n_jobs)(delayed(_normalize_and_hash)(hasher, shard) for shard in shards)
+
+    return sparse.vstack(parts).tocsr()
+
+
+def _compact_csr(X: sparse.csr_matrix) -> sparse.csr_matrix:
+    """
+    Canonical float32 CSR with int32 indices and sorted columns, which keeps
+    the solver's sparse inner loops on their fast path. Index arrays are only
+    narrowed when they fit, so very large matrices keep int64.
+
+    CSR is also the only layout the solver runs on: sklearn converts anything
+    else back to CSR on fit, and hashed columns are too scattered for blocked
+    formats (1x8 BSR stores ~8x the values of this CSR).
+    """
+    X = X.tocsr()
+
+    if X.nnz < 2**31 and X.shape[1] < 2**31:
+        X.indices = X.indices.astype(np.int32, copy=False)
+        X.indptr = X.indptr.astype(np.int32, copy=False)
+
+    X.eliminate_zeros()
+    X.sort_indices()
+    X.data = X.data.astype(np.float32, copy=False)
+
+    return X
+
+
+def _predict_batched(clf, tfidf: TfidfTransformer, X: sparse.csr_matrix) -> np.ndarray:
+    """
+    Weight and classify hashed counts a batch of rows at a time, so only one
+    batch of TF-IDF features is alive at once.
+    """
+    preds = np.empty(X.shape[0], dtype=clf.classes_.dtype)
+
+    for i in range(0, X.shape[0], PREDICT_BATCH_SIZE):
+        batch = _compact_csr(tfidf.transform(X[i:i + PREDICT_BATCH_SIZE]))
+        preds[i:i + PREDICT_BATCH_SIZE] = clf.predict(batch)
+
+    return preds
+
+
+def _format_report(report: dict) -> str:
+    """
+    Render classification_report(output_dict=True) exactly as its text form:
+    same column widths and row order, two digits.
+    """
+    width = max(max(len(name) for name in report), len("weighted avg"))
+    total = int(report["macro avg"]["support"])
+    lines = [f"{'':>{width}}  {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", ""]
+
+    for name, row in report.items():
+        if name == "accuracy":
+            lines += ["", f"{name:>{width}}  {'':>9} {'':>9} {row:>9.2f} {total:>9}"]
+            continue
+
+        lines.append(
+            f"{name:>{width}}  {row['precision']:>9.2f} {row['recall']:>9.2f} "
+            f"{row['f1-score']:>9.2f} {int(row['support']):>9}"
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def _cache_key(hasher: HashingVectorizer) -> str:
+    """
+    Content address for the hashed corpus: the dataset bytes, the normalization
+    version and the hashing config all change what the cached matrix holds.
+    """
+    h = hashlib.blake2b(DATA_PATH.read_bytes())
+    h.update(NORM_VERSION.encode())
+    h.update(repr(sorted(hasher.get_params().items())).encode())
+
+    return h.hexdigest()[:16]
+
+
+def _read_cached_corpus(x_path: Path, y_path: Path):
+    # A missing, truncated or otherwise unreadable entry is just a cache miss.
+    try:
+        with np.load(y_path) as labels:
+            return sparse.load_npz(x_path), labels["codes"], labels["classes"]
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        return None
+
+
+def _save_cached_corpus(key: str, X: sparse.csr_matrix, y: np.ndarray, classes: np.ndarray) -> None:
+    # Same scheme as the retrieval matrix cache: both files are written under
+    # per-process temporary names and swapped in, matrix first and labels last,
+    # so a reader never sees a half-written entry. Entries for other keys (older
+    # datasets or normalization versions) are pruned; a failed write just means
+    # no cache.
+    x_path = CACHE_DIR / f"{key}.npz"
+    y_path = CACHE_DIR / f"{key}.labels.npz"
+    tmp_x = CACHE_DIR / f"{key}.{os.getpid()}.tmp.npz"
+    tmp_y = CACHE_DIR / f"{key}.labels.{os.getpid()}.tmp.npz"
+
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        sparse.save_npz(tmp_x, X)
+        os.replace(tmp_x, x_path)
+        np.savez(tmp_y, codes=y, classes=classes)
+        os.replace(tmp_y, y_path)
+    except OSError:
+        for tmp in (tmp_x, tmp_y):
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+        return
+
+    for stale in CACHE_DIR.glob("*.npz"):
+        if not stale.name.startswith(f"{key}.") and ".tmp." not in stale.name:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+
+def _load_corpus(hasher: HashingVectorizer) -> tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Hashed term counts, int32 label codes and the sorted family names the codes
+    index, for the whole dataset. Memoized under models/cache/ so repeat runs
+    skip reading and normalizing the CSV.
+    """
+    key = _cache_key(hasher)
+    cached = _read_cached_corpus(CACHE_DIR / f"{key}.npz", CACHE_DIR / f"{key}.labels.npz")
+
+    if cached is not None:
+        return cached
+
+    # Only the two training columns are parsed, by pyarrow's multithreaded
+    # reader. Tracebacks span several lines inside quoted fields, so the reader
+    # must be told values can contain newlines or it splits blocks mid-record.
+    try:
+        table = pa_csv.read_csv(
+            DATA_PATH,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=["error_text", "error_family"],
+                column_types={"error_text": pa.string(), "error_family": pa.string()},
+            ),
+        )
+    except KeyError as e:
+        raise ValueError("CSV must contain 'error_text' and 'error_family' columns") from e
+
+    X = _hash_texts(hasher, table.column("error_text").to_pylist())
+    classes, y = np.unique(table.column("error_family").to_numpy().astype(str), return_inverse=True)
+    y = y.astype(np.int32)
+
+    _save_cached_corpus(key, X, y, classes)
+
+    return X, y, classes
+
 
 def main() -> None:
     if not DATA_PATH.exists():
@@ -27,48 +242,69 @@ def main() -> None:
 
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
-    df = pd.read_csv(DATA_PATH)
+    # The TF-IDF weighting is learned on top of the hashed counts; the fitted
+    # weights and hashing config are saved together as one artifact.
+    vectorizer = build_vectorizer(N_FEATURES)
+    tfidf = vectorizer.named_steps["tfidf"]
 
-    if not {"error_text", "error_family"}.issubset(df.columns):
-        raise ValueError("CSV must contain 'error_text' and 'error_family' columns")
+    X, y, classes = _load_corpus(vectorizer.named_steps["hash"])
 
-    X = df["error_text"].astype(str).apply(normalize_text)
-    y = df["error_family"].astype(str)
+    # The corpus is hashed once; the split only picks row indices, and the
+    # stateless hasher means nothing is learned from the test rows.
+    sss = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+    (train_idx, test_idx), = sss.split(np.zeros(len(y)), y)
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X,
-        y,
-        test_size=0.2,
-        random_state=42,
-        stratify=y,
-    )
+    X_train, X_test = X[train_idx], X[test_idx]
+    y_train, y_test = y[train_idx], y[test_idx]
 
-    vectorizer = TfidfVectorizer(
-        ngram_range=(1, 2),
-        min_df=2,
-        max_df=0.95,
-    )
+    # Keep the matrices float32 for the solver. scikit-learn >= 1.4 preserves
+    # the hashed dtype through TfidfTransformer; older versions upcast.
+    tfidf.fit(X_train)
+    doc_freq = np.bincount(X_train.indices, minlength=X_train.shape[1])
+    tfidf.idf_ = np.where(doc_freq < MIN_DF, 0, tfidf.idf_).astype(tfidf.idf_.dtype)
 
-    X_train_vec = vectorizer.fit_transform(X_train)
-    X_test_vec = vectorizer.transform(X_test)
+    X_train_vec = _compact_csr(tfidf.transform(X_train))
 
+    # saga LR is kept over LinearSVC: on 24k hashed rows liblinear's dual
+    # solver alone takes ~3x as long, the primal one ~100x (n_features >>
+    # n_samples), and predict needs probabilities, which would mean a further
+    # cv=3 calibration wrapper. LR gives predict_proba directly.
     clf = LogisticRegression(
+        solver="saga",
         max_iter=2000,
-        class_weight="balanced",
-        n_jobs=1,
+        tol=1e-3,
     )
 
-    clf.fit(X_train_vec, y_train)
+    # Balanced class weights, computed once as per-row weights in the matrix's
+    # dtype, which is what the solver would otherwise build internally.
+    sample_weight = compute_sample_weight("balanced", y_train).astype(X_train_vec.dtype)
 
-    y_pred = clf.predict(X_test_vec)
-    macro_f1 = f1_score(y_test, y_pred, average="macro")
+    # The classifier is fitted and scored on integer codes; family names are
+    # only attached for the report and for the saved model, which predict.py
+    # reads classes_ from.
+    clf.fit(X_train_vec, y_train, sample_weight=sample_weight)
+
+    y_pred = _predict_batched(clf, tfidf, X_test)
+    report = classification_report(
+        y_test,
+        y_pred,
+        labels=np.arange(len(classes)),
+        target_names=classes,
+        output_dict=True,
+        zero_division=0,
+    )
+    macro_f1 = report["macro avg"]["f1-score"]
 
     print("\n=== Classification Report ===")
-    print(classification_report(y_test, y_pred))
+    print(_format_report(report))
     print(f"Macro F1: {macro_f1:.3f}")
 
-    joblib.dump(vectorizer, TFIDF_PATH)
-    joblib.dump(clf, CLF_PATH)
+    clf.classes_ = classes[clf.classes_]
+    clf.coef_ = clf.coef_.astype(np.float32, copy=False)
+    clf.intercept_ = clf.intercept_.astype(np.float32, copy=False)
+
+    save_vectorizer(vectorizer, TFIDF_PATH)
+    joblib.dump(clf, CLF_PATH, compress=COMPRESS, protocol=5)
 
 
 if __name__ == "__main__":
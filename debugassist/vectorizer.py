@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline
+from debugassist.preprocess import NORM_VERSION
+
+
+TFIDF_PATH = Path("models/tfidf.npz")
+
+# Bump whenever build_vectorizer's fixed settings (tokenizer, TF-IDF options)
+# or the saved layout change, so artifacts from an older layout are rejected
+# instead of loading into a pipeline that produces different features.
+FORMAT_VERSION = "1"
+
+
+def build_vectorizer(n_features: int, ngram_range: tuple[int, int] = (1, 2)) -> Pipeline:
+    """
+    Hashed uni/bigram counts followed by sublinear, L2-normalized TF-IDF.
+    Hashing needs no vocabulary dict, and normalize_text already lowercases and
+    emits space-separated tokens, so str.split is the whole tokenizer.
+    """
+    return Pipeline([
+        ("hash", HashingVectorizer(
+            ngram_range=ngram_range,
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32,
+            tokenizer=str.split,
+            token_pattern=None,
+            lowercase=False,
+        )),
+        ("tfidf", TfidfTransformer(norm="l2", sublinear_tf=True)),
+    ])
+
+
+def save_vectorizer(vectorizer: Pipeline, path: Path = TFIDF_PATH) -> None:
+    """
+    Persist only what a fitted vectorizer learned: the hashing config and the
+    non-zero IDF weights, tagged with the format and normalization versions
+    they were built under. Buckets never seen (or pruned) in training have
+    zero IDF, so the sparse form is a small fraction of the dense array.
+    """
+    hasher = vectorizer.named_steps["hash"]
+    idf = vectorizer.named_steps["tfidf"].idf_
+    (idx,) = np.nonzero(idf)
+
+    np.savez(
+        path,
+        format_version=FORMAT_VERSION,
+        norm_version=NORM_VERSION,
+        n_features=hasher.n_features,
+        ngram_range=np.asarray(hasher.ngram_range),
+        idf_idx=idx.astype(np.int32),
+        idf=idf[idx].astype(np.float32),
+    )
+
+
+@lru_cache(maxsize=None)
+def load_vectorizer() -> Pipeline:
+    """Rebuild the fitted TF-IDF vectorizer once per process and share it."""
+    with np.load(TFIDF_PATH) as state:
+        versions = {
+            key: str(state[key]) if key in state.files else None
+            for key in ("format_version", "norm_version")
+        }
+
+        if versions != {"format_version": FORMAT_VERSION, "norm_version": NORM_VERSION}:
+            raise ValueError(
+                f"Vectorizer at {TFIDF_PATH} was saved with format/normalization "
+                f"{versions['format_version']}/{versions['norm_version']}, but this code "
+                f"uses {FORMAT_VERSION}/{NORM_VERSION}. Re-run: python3 -m debugassist.train"
+            )
+
+        vectorizer = build_vectorizer(int(state["n_features"]), tuple(state["ngram_range"].tolist()))
+
+        idf = np.zeros(vectorizer.named_steps["hash"].n_features, dtype=np.float32)
+        idf[state["idf_idx"]] = state["idf"]
+
+    vectorizer.named_steps["tfidf"].idf_ = idf
+
+    return vectorizer
@@ -0,0 +1,16 @@
+from setuptools import setup
+
+# The compiled preprocess extension is optional: without Cython the package
+# installs pure-Python and preprocess.py uses its own normalize_text.
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = cythonize("debugassist/_preprocess_fast.pyx", language_level=3)
+
+setup(
+    name="debugassist",
+    packages=["debugassist"],
+    ext_modules=ext_modules,
+)